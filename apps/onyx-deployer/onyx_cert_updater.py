@@ -8,34 +8,81 @@ Supports importing external certificates and setting them as the HTTPS certifica
 """
 
 import argparse
-import http.cookiejar
+import email.utils
+import http.client
+import http.cookies
 import json
 import logging
 import os
+import select
 import ssl
 import sys
-import urllib.error
+import threading
+import time
 import urllib.parse
-import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from pathlib import Path
+
+try:
+    import orjson
+
+    def _json_dumps(obj):
+        return orjson.dumps(obj)
+
+    _json_loads = orjson.loads
+except ImportError:
+    # Fall back to stdlib json if orjson not available
+
+    def _json_dumps(obj):
+        return json.dumps(obj).encode("utf-8")
+
+    _json_loads = json.loads
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
 
 REQUEST_TIMEOUT = 30
+JSON_LOGIN_PATH = "/admin/launch?script=rh&template=json-request&action=json-login"
+MAX_REDIRECTS = 5
+REDIRECT_CODES = (301, 302, 303, 307, 308)
 
+# Key formats used for a certificate's section in "show crypto certificate" output
+CERT_KEY_FORMATS = ("Certificate with name '{}'", "{}")
 
-class PostRedirectHandler(urllib.request.HTTPRedirectHandler):
-    """Custom redirect handler that preserves POST data on redirects"""
+# SSL context that ignores certificate verification (switches use self-signed certs).
+# Built once and shared so the system CA bundle isn't loaded per switch, and so
+# ResumingHTTPSConnection can resume sessions created by it.
+SSL_CONTEXT = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+SSL_CONTEXT.check_hostname = False
+SSL_CONTEXT.verify_mode = ssl.CERT_NONE
 
-    def redirect_request(self, req, fp, code, msg, headers, newurl):
+
+class ResumingHTTPSConnection(http.client.HTTPSConnection):
+    """HTTPSConnection that resumes the previous TLS session when it reconnects"""
+
+    tls_session = None
+
+    def connect(self):
         """
-        Override to preserve POST method and data on redirect
+        Override to pass the last TLS session to wrap_socket
         """
-        new_req = urllib.request.Request(
-            newurl,
-            data=req.data,
-            headers=dict(req.headers.items()),
-            method=req.get_method(),
+        http.client.HTTPConnection.connect(self)
+        self.sock = self._context.wrap_socket(
+            self.sock,
+            server_hostname=self._tunnel_host or self.host,
+            session=self.tls_session,
         )
-        return new_req
+
+    def close(self):
+        """
+        Override to keep the TLS session (TLS 1.3 tickets arrive after the handshake)
+        """
+        if isinstance(self.sock, ssl.SSLSocket):
+            self.tls_session = self.sock.session
+        super().close()
 
 
 class OnyxCertUpdater:
@@ -52,50 +99,112 @@ class OnyxCertUpdater:
         logging.basicConfig(level=log_level, format="%(asctime)s - %(levelname)s - %(message)s")
         self.logger = logging.getLogger("OnyxCertUpdater")
 
-        # Create SSL context that ignores certificate verification
-        self.ssl_context = ssl.create_default_context()
-        self.ssl_context.check_hostname = False
-        self.ssl_context.verify_mode = ssl.CERT_NONE
-
-        # Setup cookie handling for session management
-        self.cookie_jar = http.cookiejar.CookieJar()
-        self.opener = urllib.request.build_opener(
-            urllib.request.HTTPSHandler(context=self.ssl_context),
-            urllib.request.HTTPCookieProcessor(self.cookie_jar),
-            PostRedirectHandler(),
+        self.ssl_context = SSL_CONTEXT
+
+        # Single keep-alive connection so the TLS handshake happens once per run
+        self.conn = ResumingHTTPSConnection(
+            hostname, timeout=REQUEST_TIMEOUT, context=self.ssl_context
         )
+        self.session_cookie = None
+        self.session_expires = None
+
+        # Use json-login endpoint until we learn where it redirects to
+        self.api_path = JSON_LOGIN_PATH
+
+        # Reusable parser for lazily-decoded "show" output (pysimdjson optional)
+        self._sjparser = simdjson.Parser() if simdjson else None
+
+    def _send(self, method, path, body, headers):
+        """
+        Send a request over the persistent connection, reconnecting once if the
+        switch had already closed the idle keep-alive socket
+        :return: http.client.HTTPResponse
+        """
+        # An idle keep-alive socket has nothing to read unless the switch closed it
+        if self.conn.sock is not None and select.select([self.conn.sock], [], [], 0)[0]:
+            self.logger.debug("Idle connection closed by switch, reconnecting")
+            self.conn.close()
+
+        reused = self.conn.sock is not None
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            return self.conn.getresponse()
+        except http.client.RemoteDisconnected:
+            # Only a reused idle socket closed without any response is safe to
+            # retry - anything else may mean the switch already ran the command
+            self.conn.close()
+            if not reused:
+                raise
+            self.logger.debug("Idle connection closed by switch, retrying")
+            self.conn.request(method, path, body=body, headers=headers)
+            return self.conn.getresponse()
+        except Exception:
+            self.conn.close()
+            raise
+
+    def _request(self, method, path, body=None, headers=None):
+        """
+        Send a request, tracking the session cookie and following redirects
+        with the original method and body preserved
+        :return: tuple of (response, response body bytes, final path)
+        """
+        headers = dict(headers or {})
+        for _ in range(MAX_REDIRECTS + 1):
+            if self.session_cookie:
+                headers["Cookie"] = f"session={self.session_cookie}"
+
+            response = self._send(method, path, body, headers)
+            data = response.read()
+
+            for set_cookie in response.headers.get_all("Set-Cookie") or []:
+                cookie = http.cookies.SimpleCookie(set_cookie)
+                if "session" in cookie:
+                    self.session_cookie = cookie["session"].value
+                    self.session_expires = cookie_expiry(cookie["session"])
+
+            location = response.getheader("Location")
+            if response.status not in REDIRECT_CODES or not location:
+                return response, data, path
+
+            # Stay on the same connection - the switch only redirects to itself
+            parts = urllib.parse.urlsplit(urllib.parse.urljoin(self.base_url + path, location))
+            path = f"{parts.path}?{parts.query}" if parts.query else parts.path
+            self.logger.debug(f"Following {response.status} redirect to {path}")
+
+        raise http.client.HTTPException(f"Too many redirects (>{MAX_REDIRECTS})")
 
     def login(self):
         """
         Login to switch via form-based authentication
         :return: bool
         """
-        login_url = f"{self.base_url}/admin/launch?script=rh&template=login&action=login"
+        login_path = "/admin/launch?script=rh&template=login&action=login"
 
         login_data = urllib.parse.urlencode(
             {"f_user_id": self.username, "f_password": self.password}
         ).encode("utf-8")
 
         self.logger.debug(f"Logging in to {self.hostname}")
+        self.session_cookie = None
+        self.session_expires = None
 
         try:
-            request = urllib.request.Request(
-                login_url,
-                data=login_data,
+            _, _, final_path = self._request(
+                "POST",
+                login_path,
+                body=login_data,
                 headers={"Content-Type": "application/x-www-form-urlencoded"},
             )
-            response = self.opener.open(request, timeout=REQUEST_TIMEOUT)
 
             # Check if we got redirected to home (successful login)
-            if response.geturl() and "home" in response.geturl():
+            if "home" in final_path:
                 self.logger.info("Login successful")
                 return True
 
             # Also check for session cookie
-            for cookie in self.cookie_jar:
-                if cookie.name == "session":
-                    self.logger.info("Login successful (session cookie obtained)")
-                    return True
+            if self.session_cookie:
+                self.logger.info("Login successful (session cookie obtained)")
+                return True
 
             self.logger.error("Login failed - no session cookie obtained")
             return False
@@ -104,34 +213,62 @@ class OnyxCertUpdater:
             self.logger.error(f"Login error: {e}")
             return False
 
+    def _post_json(self, request, lazy=False):
+        """
+        POST a JSON API request and decode the response
+        :param request: dict to send as the JSON request body
+        :param lazy: Return a lazily-decoded document when pysimdjson is available.
+            The document is only valid until the next lazy call, so callers must
+            copy out the values they need rather than holding on to it.
+        :return: decoded response or None on error
+        """
+        payload = _json_dumps(request)
+
+        for attempt in range(2):
+            response, response_data, final_path = self._request(
+                "POST", self.api_path, body=payload, headers={"Content-Type": "application/json"}
+            )
+            if "template=login" not in final_path:
+                break
+
+            # Session expired (or was never established) - login again once
+            self.logger.warning("Session not authenticated (redirected to login page)")
+            self.api_path = JSON_LOGIN_PATH
+            if attempt or not self.login():
+                return None
+
+        # Post straight to the endpoint json-login redirected to from now on, so
+        # later commands don't upload their body twice
+        if final_path != self.api_path:
+            self.logger.debug(f"Using JSON API endpoint {final_path}")
+            self.api_path = final_path
+
+        if response.status >= 400:
+            self.logger.error(f"HTTP error {response.status}: {response.reason}")
+            return None
+
+        # Handle empty response
+        if not response_data:
+            self.logger.error("Empty response from server")
+            return None
+
+        if lazy and self._sjparser:
+            return self._sjparser.parse(response_data)
+        return _json_loads(response_data)
+
     def execute_command(self, cmd):
         """
         Execute a command via JSON API
         :param cmd: Command string to execute
         :return: dict with response or None on error
         """
-        # Use json-login endpoint - PostRedirectHandler will preserve POST data on redirect
-        api_url = f"{self.base_url}/admin/launch?script=rh&template=json-request&action=json-login"
-
-        payload = json.dumps({"cmd": cmd}).encode("utf-8")
-
         self.logger.debug(f"Executing command: {cmd[:100]}...")
 
         try:
-            request = urllib.request.Request(
-                api_url, data=payload, headers={"Content-Type": "application/json"}, method="POST"
-            )
-
-            response = self.opener.open(request, timeout=REQUEST_TIMEOUT)
-            response_data = response.read().decode("utf-8")
-
-            # Handle empty response
-            if not response_data:
-                self.logger.error("Empty response from server")
+            result = self._post_json({"cmd": cmd})
+            if result is None:
                 return None
 
-            result = json.loads(response_data)
-
             if result.get("status") == "OK":
                 self.logger.debug(f"Command successful: {result.get('status_message', '')}")
                 return result
@@ -145,12 +282,54 @@ class OnyxCertUpdater:
             self.logger.error(f"Command execution error: {e}")
             return None
 
-    def get_current_cert_info(self):
+    def execute_commands(self, cmds, lazy=False):
+        """
+        Execute several commands in a single JSON API request
+        :param cmds: List of command strings to execute in order
+        :param lazy: Return lazily-decoded documents (see _post_json)
+        :return: list with one response per command (None for commands the switch
+            did not run) or None on error
+        """
+        for cmd in cmds:
+            self.logger.debug(f"Executing command: {cmd[:100]}...")
+
+        try:
+            response = self._post_json({"commands": cmds}, lazy=lazy)
+            if response is None:
+                return None
+
+            # The switch rejected the batch as a whole (e.g. no batch support)
+            if "results" not in response:
+                self.logger.error(
+                    f"Command failed: {response.get('status_message', 'Unknown error')}"
+                )
+                return None
+
+            # Ignore any extra results so there is exactly one slot per command
+            results = list(response["results"])[: len(cmds)]
+            for cmd, result in zip(cmds, results, strict=False):
+                if result.get("status") == "OK":
+                    self.logger.debug(f"Command successful: {result.get('status_message', '')}")
+                else:
+                    self.logger.error(
+                        f"Command failed: {cmd[:100]}: "
+                        f"{result.get('status_message', 'Unknown error')}"
+                    )
+
+            # The switch stops at the first failing command
+            return results + [None] * (len(cmds) - len(results))
+
+        except Exception as e:
+            self.logger.error(f"Command execution error: {e}")
+            return None
+
+    @staticmethod
+    def _parse_cert_info(result):
         """
-        Get information about the current HTTPS certificate
+        Extract the HTTPS certificate details from "show web" output
+        :param result: response to "show web"
         :return: dict with cert info or None
         """
-        result = self.execute_command("show web")
         if not result or result.get("status") != "OK":
             return None
 
@@ -164,70 +343,111 @@ class OnyxCertUpdater:
                 }
         return None
 
-    def get_cert_validity(self, cert_name):
+    @staticmethod
+    def _parse_cert_validity(result, cert_name):
         """
-        Get certificate validity dates
+        Extract certificate validity dates from "show crypto certificate" output
+        :param result: response to "show crypto certificate"
         :param cert_name: Name of certificate
         :return: dict with validity info or None
         """
-        result = self.execute_command("show crypto certificate")
         if not result or result.get("status") != "OK":
             return None
 
         data = result.get("data", [])
-        for cert in data:
-            for key in cert:
-                if cert_name in key:
-                    cert_data = cert[key]
-                    for item in cert_data:
-                        if "Validity" in item:
-                            validity = item["Validity"][0]
-                            return {
-                                "starts": validity.get("Starts"),
-                                "expires": validity.get("Expires"),
-                            }
+
+        # Look the certificate up by its exact key first
+        keys = [fmt.format(cert_name) for fmt in CERT_KEY_FORMATS]
+        cert_data = next((cert[key] for cert in data for key in keys if key in cert), None)
+
+        # Unknown key format - fall back to matching the name anywhere in the key
+        if cert_data is None:
+            cert_data = next((cert[key] for cert in data for key in cert if cert_name in key), None)
+
+        for item in cert_data or []:
+            if "Validity" in item:
+                validity = item["Validity"][0]
+                return {
+                    "starts": validity.get("Starts"),
+                    "expires": validity.get("Expires"),
+                }
         return None
 
-    def import_certificate(self, cert_name, cert_pem, key_pem):
+    def get_cert_state(self, cert_name):
+        """
+        Get the current HTTPS certificate info and the validity of cert_name
+        in a single request
+        :param cert_name: Name of certificate
+        :return: tuple of (cert info dict or None, validity dict or None), or None
+            if the request failed
+        """
+        results = self.execute_commands(["show web", "show crypto certificate"], lazy=True)
+        if results is None:
+            return None
+        return (
+            self._parse_cert_info(results[0]),
+            self._parse_cert_validity(results[1], cert_name),
+        )
+
+    def update_certificate(self, cert_name, cert_pem, key_pem, save=True):
         """
-        Import a certificate and private key
+        Import a certificate and private key, set it as the HTTPS certificate,
+        optionally save the configuration and read back the HTTPS certificate,
+        all in a single request
         :param cert_name: Name for the certificate
         :param cert_pem: PEM-encoded certificate
         :param key_pem: PEM-encoded private key
-        :return: bool
+        :param save: Save configuration after setting the HTTPS certificate
+        :return: dict with "imported", "https_set" and "saved" bools and the
+            resulting "cert_info" (or None)
         """
-        # Import public certificate
-        self.logger.info(f"Importing public certificate as '{cert_name}'")
-        cert_cmd = f'crypto certificate name {cert_name} public-cert pem "{cert_pem}"'
-        result = self.execute_command(cert_cmd)
-        if not result or result.get("status") != "OK":
-            self.logger.error(f"Failed to import public certificate: {result}")
-            return False
-
-        # Import private key
-        self.logger.info(f"Importing private key for '{cert_name}'")
-        key_cmd = f'crypto certificate name {cert_name} private-key pem "{key_pem}"'
-        result = self.execute_command(key_cmd)
-        if not result or result.get("status") != "OK":
-            self.logger.error(f"Failed to import private key: {result}")
-            return False
-
-        self.logger.info("Certificate and key imported successfully")
-        return True
-
-    def set_https_certificate(self, cert_name):
+        self.logger.info(f"Importing certificate and key as '{cert_name}' and setting as HTTPS")
+        steps = [
+            (
+                f'crypto certificate name {cert_name} public-cert pem "{cert_pem}"',
+                "Failed to import public certificate",
+            ),
+            (
+                f'crypto certificate name {cert_name} private-key pem "{key_pem}"',
+                "Failed to import private key",
+            ),
+            (f"web https certificate name {cert_name}", "Failed to set HTTPS certificate"),
+        ]
+        if save:
+            steps.append(("write memory", "Failed to save configuration"))
+        steps.append(("show web", None))
+
+        results = self.execute_commands([cmd for cmd, _ in steps])
+        if results is None:
+            results = [None] * len(steps)
+
+        # The switch skips every command after the first failure, so only that
+        # one is reported
+        ok = []
+        for (_, error), result in zip(steps, results, strict=True):
+            succeeded = bool(result) and result.get("status") == "OK"
+            if not succeeded and error and all(ok):
+                self.logger.error(f"{error}: {result}")
+            ok.append(succeeded)
+
+        if save and ok[3]:
+            self.logger.info("Configuration saved")
+
+        return {
+            "imported": ok[0] and ok[1],
+            "https_set": ok[2],
+            "saved": save and ok[3],
+            "cert_info": self._parse_cert_info(results[-1]),
+        }
+
+    def session_state(self):
         """
-        Set the certificate to use for HTTPS
-        :param cert_name: Name of certificate to use
-        :return: bool
+        Get the current session cookie for caching between runs
+        :return: dict with cookie and expiry, or None if the cookie has no known lifetime
         """
-        self.logger.info(f"Setting HTTPS certificate to '{cert_name}'")
-        result = self.execute_command(f"web https certificate name {cert_name}")
-        if not result or result.get("status") != "OK":
-            self.logger.error(f"Failed to set HTTPS certificate: {result}")
-            return False
-
-        return True
+        if not self.session_cookie or not self.session_expires:
+            return None
+        return {"cookie": self.session_cookie, "expires": self.session_expires}
 
     def delete_certificate(self, cert_name):
         """
@@ -242,29 +462,89 @@ class OnyxCertUpdater:
             return False
         return True
 
-    def save_config(self):
-        """
-        Save configuration to persistent storage
-        :return: bool
-        """
-        self.logger.info("Saving configuration")
-        result = self.execute_command("write memory")
-        if not result or result.get("status") != "OK":
-            self.logger.error(f"Failed to save configuration: {result}")
-            return False
+
+def cookie_expiry(morsel):
+    """Return cookie expiry as a Unix timestamp, or None for a browser-session cookie"""
+    try:
+        if morsel["max-age"]:
+            return time.time() + int(morsel["max-age"])
+        if morsel["expires"]:
+            return email.utils.parsedate_to_datetime(morsel["expires"]).timestamp()
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def state_path(hostname):
+    """Return path of the local state cache for a switch"""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return Path(cache_home) / "onyx_cert_updater" / f"{hostname}.json"
+
+
+def load_state(hostname):
+    """Load cached certificate expiry and session state for a switch ({} if missing or malformed)"""
+    try:
+        with open(state_path(hostname), "rb") as fh:
+            state = _json_loads(fh.read())
+    except (OSError, ValueError):
+        return {}
+
+    if not isinstance(state, dict):
+        return {}
+
+    # {"certs": {<cert name>: {"expires": <ISO date>}}, ...}
+    certs = state.get("certs", {})
+    if not isinstance(certs, dict) or not all(
+        isinstance(cert, dict) and isinstance(cert.get("expires", ""), str)
+        for cert in certs.values()
+    ):
+        return {}
+
+    # {"session": {"cookie": <value>, "expires": <Unix timestamp>}, ...}
+    session = state.get("session", {})
+    if (
+        not isinstance(session, dict)
+        or not isinstance(session.get("cookie", ""), str)
+        or isinstance(session.get("expires", 0), bool)
+        or not isinstance(session.get("expires", 0), int | float)
+    ):
+        return {}
+
+    return state
+
+
+def save_state(hostname, state, session=None):
+    """Persist certificate expiry and session state for a switch (best effort)"""
+    # Drop a cached session we can't vouch for (e.g. rejected and replaced by a
+    # cookie without a known lifetime) so later runs don't keep retrying it
+    if session:
+        state["session"] = session
+    else:
+        state.pop("session", None)
+
+    path = state_path(hostname)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        # O_CREAT's mode only applies to new files - tighten an existing one too
+        os.fchmod(fd, 0o600)
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(_json_dumps(state))
         return True
+    except OSError:
+        return False
 
 
 def parse_cert_expiry(pem_file):
     """Parse certificate expiration date from PEM file"""
     try:
-        from OpenSSL import crypto as c
+        from cryptography import x509
 
         with open(pem_file, "rb") as fh:
-            cert = c.load_certificate(c.FILETYPE_PEM, fh.read())
-        return datetime.strptime(cert.get_notAfter().decode("utf8"), "%Y%m%d%H%M%SZ")
+            cert = x509.load_pem_x509_certificate(fh.read())
+        return cert.not_valid_after_utc.replace(tzinfo=None)
     except ImportError:
-        # Fall back to openssl command if pyOpenSSL not available
+        # Fall back to openssl command if cryptography not available
         import subprocess
 
         result = subprocess.run(
@@ -285,11 +565,114 @@ def read_pem_file(filepath):
         return f.read().strip()
 
 
+def update_one(hostname, args, echo=print):
+    """
+    Update the certificate on a single switch
+    :param hostname: Switch hostname or IP address
+    :param args: Parsed command line arguments
+    :param echo: print-like function for user-facing output
+    :return: exit code
+    """
+    # Check if update is needed (compare expiry dates) before touching the network
+    new_expiry = parse_cert_expiry(args.cert_file)
+    state = load_state(hostname)
+    cached_cert = state.get("certs", {}).get(args.cert_name, {})
+    if (
+        new_expiry
+        and not args.force_update
+        and cached_cert.get("expires") == new_expiry.isoformat()
+    ):
+        echo("Certificate already up to date (cached expiry dates match)")
+        return 0
+
+    # Create updater
+    updater = OnyxCertUpdater(
+        hostname=hostname, username=args.username, password=args.password, debug=args.debug
+    )
+
+    # Reuse cached session if it hasn't expired, otherwise login
+    cert_state = None
+    session = state.get("session", {})
+    if session.get("cookie") and session.get("expires", 0) > time.time():
+        updater.session_cookie = session["cookie"]
+        updater.session_expires = session["expires"]
+        cert_state = updater.get_cert_state(args.cert_name)
+    if cert_state is None:
+        if not updater.login():
+            echo("ERROR: Login failed!")
+            return 2
+        cert_state = updater.get_cert_state(args.cert_name)
+        if cert_state is None:
+            echo("ERROR: Failed to read certificate state!")
+            return 2
+
+    # Get current certificate info and existing cert with same name
+    current_info, existing_validity = cert_state
+    if current_info and not args.quiet:
+        echo(f"Current HTTPS certificate: {current_info.get('cert_name')}")
+
+    if new_expiry and not args.quiet:
+        echo(f"New certificate expires: {new_expiry}")
+
+    # Check existing cert with same name
+    if existing_validity and not args.force_update:
+        existing_expiry_str = existing_validity.get("expires")
+        if existing_expiry_str:
+            existing_expiry = datetime.strptime(existing_expiry_str, "%Y/%m/%d %H:%M:%S")
+            if new_expiry and existing_expiry == new_expiry:
+                state.setdefault("certs", {})[args.cert_name] = {"expires": new_expiry.isoformat()}
+                save_state(hostname, state, updater.session_state())
+                echo("Certificate already up to date (expiry dates match)")
+                return 0
+
+    # Read certificate and key files
+    cert_pem = read_pem_file(args.cert_file)
+    key_pem = read_pem_file(args.key_file)
+
+    # Delete existing certificate with same name if it exists
+    if existing_validity:
+        if not args.quiet:
+            echo(f"Removing existing certificate '{args.cert_name}'")
+        updater.delete_certificate(args.cert_name)
+
+    # Import new certificate, set as HTTPS certificate, save and verify
+    status = updater.update_certificate(args.cert_name, cert_pem, key_pem, save=not args.no_save)
+    if not status["imported"]:
+        echo("ERROR: Failed to import certificate!")
+        return 2
+    if not status["https_set"]:
+        echo("ERROR: Failed to set HTTPS certificate!")
+        return 2
+    if not args.no_save and not status["saved"]:
+        echo("WARNING: Failed to save configuration!")
+
+    # Only trust the cached expiry next run if the switch config was persisted
+    if new_expiry and status["saved"]:
+        state.setdefault("certs", {})[args.cert_name] = {"expires": new_expiry.isoformat()}
+    if not save_state(hostname, state, updater.session_state()):
+        updater.logger.debug(f"Could not write state cache {state_path(hostname)}")
+
+    if not args.quiet:
+        echo("Certificate updated successfully!")
+
+    # Verified by the "show web" at the end of the update batch; if the switch
+    # stopped before running it, the OK from setting the certificate is enough
+    if not args.quiet:
+        new_info = status["cert_info"] or {"cert_name": args.cert_name}
+        echo(f"HTTPS certificate is now: {new_info.get('cert_name')}")
+
+    return 0
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Update NVIDIA Onyx switch SSL certificate via JSON API"
     )
-    parser.add_argument("--hostname", required=True, help="Onyx switch hostname or IP address")
+    parser.add_argument(
+        "--hostname",
+        required=True,
+        help="Onyx switch hostname or IP address (comma-separated to update several switches)",
+    )
     parser.add_argument("--username", required=True, help="Switch username with admin access")
     parser.add_argument("--password", required=True, help="Switch password")
     parser.add_argument(
@@ -320,69 +703,42 @@ def main():
         print(f"ERROR: --cert-file '{args.cert_file}' doesn't exist!")
         sys.exit(2)
 
-    # Create updater
-    updater = OnyxCertUpdater(
-        hostname=args.hostname, username=args.username, password=args.password, debug=args.debug
-    )
-
-    # Login
-    if not updater.login():
-        print("ERROR: Login failed!")
+    # Drop duplicates so two workers never share a switch (or its state cache file)
+    hosts = list(dict.fromkeys(host.strip() for host in args.hostname.split(",") if host.strip()))
+    if not hosts:
+        print("ERROR: --hostname is empty!")
         sys.exit(2)
 
-    # Get current certificate info
-    current_info = updater.get_current_cert_info()
-    if current_info and not args.quiet:
-        print(f"Current HTTPS certificate: {current_info.get('cert_name')}")
+    if len(hosts) == 1:
+        sys.exit(update_one(hosts[0], args))
 
-    # Check if update is needed (compare expiry dates)
-    new_expiry = parse_cert_expiry(args.cert_file)
-    if new_expiry and not args.quiet:
-        print(f"New certificate expires: {new_expiry}")
-
-    # Check existing cert with same name
-    existing_validity = updater.get_cert_validity(args.cert_name)
-    if existing_validity and not args.force_update:
-        existing_expiry_str = existing_validity.get("expires")
-        if existing_expiry_str:
-            existing_expiry = datetime.strptime(existing_expiry_str, "%Y/%m/%d %H:%M:%S")
-            if new_expiry and existing_expiry == new_expiry:
-                print("Certificate already up to date (expiry dates match)")
-                sys.exit(0)
-
-    # Read certificate and key files
-    cert_pem = read_pem_file(args.cert_file)
-    key_pem = read_pem_file(args.key_file)
-
-    # Delete existing certificate with same name if it exists
-    if existing_validity:
-        if not args.quiet:
-            print(f"Removing existing certificate '{args.cert_name}'")
-        updater.delete_certificate(args.cert_name)
+    # Configure logging once, tagging records with the switch being updated
+    logging.basicConfig(
+        level=logging.DEBUG if args.debug else logging.INFO,
+        format="%(asctime)s - %(threadName)s - %(levelname)s - %(message)s",
+    )
 
-    # Import new certificate
-    if not updater.import_certificate(args.cert_name, cert_pem, key_pem):
-        print("ERROR: Failed to import certificate!")
-        sys.exit(2)
+    print_lock = threading.Lock()
 
-    # Set as HTTPS certificate
-    if not updater.set_https_certificate(args.cert_name):
-        print("ERROR: Failed to set HTTPS certificate!")
-        sys.exit(2)
+    def run(hostname):
+        threading.current_thread().name = hostname
 
-    # Save configuration
-    if not args.no_save and not updater.save_config():
-        print("WARNING: Failed to save configuration!")
+        def echo(msg):
+            with print_lock:
+                print(f"[{hostname}] {msg}")
 
-    if not args.quiet:
-        print("Certificate updated successfully!")
+        # Don't let one switch's failure abort the rest of the fleet
+        try:
+            return update_one(hostname, args, echo=echo)
+        except Exception as e:
+            logging.getLogger("OnyxCertUpdater").error(f"Update of {hostname} failed: {e}")
+            return 2
 
-    # Verify
-    new_info = updater.get_current_cert_info()
-    if new_info and not args.quiet:
-        print(f"HTTPS certificate is now: {new_info.get('cert_name')}")
+    # Switches are independent TLS sessions, so update them concurrently
+    with ThreadPoolExecutor(max_workers=min(32, len(hosts))) as executor:
+        results = list(executor.map(run, hosts))
 
-    sys.exit(0)
+    sys.exit(max(results))
 
 
 if __name__ == "__main__":